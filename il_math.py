@@ -0,0 +1,108 @@
+import streamlit as st
+import math
+import numpy as np
+import pyarrow as pa
+
+# ======================================================
+# ---------------- UTILITY FUNCTIONS -------------------
+# ======================================================
+
+def compute_L_from_x(x, p, sqrt_p, sqrt_pmin, inv_sqrt_pmax):
+    denom = 2 * sqrt_p - sqrt_pmin - p * inv_sqrt_pmax
+    if denom <= 0:
+        return math.nan
+    return p * x / denom
+
+def x_amount(L, sqrt_p, inv_sqrt_pmax):
+    return L * (1/sqrt_p - inv_sqrt_pmax)
+
+def y_amount(L, sqrt_p, sqrt_pmin):
+    return L * (sqrt_p - sqrt_pmin)
+
+def x_amount_future(L, p_prime, pmin, pmax, inv_sqrt_pmax):
+    # all-x below pmin, all-y above pmax: clamp p' into the active range
+    p_eff = min(max(p_prime, pmin), pmax)
+    return L * (1/math.sqrt(p_eff) - inv_sqrt_pmax)
+
+def y_amount_future(L, p_prime, pmin, pmax, sqrt_pmin):
+    p_eff = min(max(p_prime, pmin), pmax)
+    return L * (math.sqrt(p_eff) - sqrt_pmin)
+
+def il_curve(p_vals, L, pmin, pmax, sqrt_pmin, inv_sqrt_pmax, x_init, y_init):
+    # Array form of x_amount_future / y_amount_future: one pass of NumPy
+    # ufuncs over all p' instead of a Python call per point. Intermediates
+    # are updated in place so only three temporaries are ever allocated.
+    sqrt_peff = np.clip(p_vals, pmin, pmax)
+    np.sqrt(sqrt_peff, out=sqrt_peff)
+    inv_sqrt_peff = np.reciprocal(sqrt_peff)
+    inv_p = np.reciprocal(p_vals)
+
+    # V_LP = x' + y'/p' with the range terms of both legs folded into constants
+    A = L * inv_sqrt_pmax
+    B = L * sqrt_pmin
+    Vlp = inv_sqrt_peff
+    Vlp *= L
+    Vlp -= A
+    y_leg = sqrt_peff
+    y_leg *= L
+    y_leg -= B
+    y_leg *= inv_p
+    Vlp += y_leg
+
+    Vhodl = inv_p
+    Vhodl *= y_init
+    Vhodl += x_init
+
+    # IL = (V_HODL - V_LP) / V_HODL, written into the V_LP buffer
+    np.subtract(Vhodl, Vlp, out=Vlp)
+    Vlp /= Vhodl
+    return Vlp
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def il_curve_table(L, pmin, pmax, x_init, y_init, n_plateau=30, n_range=120):
+    # Chart data from slightly below pmin to slightly above pmax; reruns that
+    # leave the position unchanged (e.g. only p' moved) hit the cache
+    sqrt_pmin = math.sqrt(pmin)
+    inv_sqrt_pmax = 1 / math.sqrt(pmax)
+    p_low = max(1e-12, pmin * 0.9)
+    p_high = pmax * 1.1
+    p_edge = max(p_low, pmin)
+
+    # Sample densely inside the range and sparsely on the two plateaus,
+    # sharing the boundary points between neighbouring segments. When pmin
+    # sits at or below the grid floor there is no all-x plateau to draw.
+    p_mid = np.linspace(p_edge, pmax, n_range, dtype=np.float64)
+    if p_edge > p_low:
+        p_left = np.linspace(p_low, p_edge, n_plateau, dtype=np.float64)
+        p_mid = p_mid[1:]
+    else:
+        p_left = np.empty(0)
+    p_right = np.linspace(pmax, p_high, n_plateau, dtype=np.float64)[1:]
+
+    # On the plateaus the position is frozen (all-x at p_edge, all-y at pmax),
+    # so IL there is a rational function of p' with no sqrt per point
+    x_plateau = L * (1/math.sqrt(p_edge) - inv_sqrt_pmax)
+    y_plateau = L * (1/inv_sqrt_pmax - sqrt_pmin)
+
+    Vhodl_left = x_init + y_init / p_left
+    Vhodl_right = x_init + y_init / p_right
+
+    p_vals = np.concatenate([p_left, p_mid, p_right])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        IL_vals = np.concatenate([
+            (Vhodl_left - x_plateau) / Vhodl_left,
+            il_curve(p_mid, L, pmin, pmax, sqrt_pmin, inv_sqrt_pmax, x_init, y_init),
+            (Vhodl_right - y_plateau / p_right) / Vhodl_right,
+        ])
+
+    # IL is undefined where the HODL value is zero; leave a gap in the chart
+    IL_vals[~np.isfinite(IL_vals)] = np.nan
+
+    # An Arrow table is what Streamlit ships to the browser anyway, so build it
+    # straight from the arrays instead of going through pandas. The math runs
+    # in float64 (IL cancels badly in float32 on narrow ranges); only the
+    # chart payload is narrowed.
+    return pa.table({
+        "p_prime": p_vals.astype(np.float32),
+        "IL": IL_vals.astype(np.float32),
+    })
@@ -1,7 +1,15 @@
 import streamlit as st
+import altair as alt
 import math
-import numpy as np
-import pandas as pd
+
+from il_math import (
+    compute_L_from_x,
+    x_amount,
+    y_amount,
+    x_amount_future,
+    y_amount_future,
+    il_curve_table,
+)
 
 st.title("Uniswap v3 Impermanent Loss Calculator")
 
@@ -9,7 +17,9 @@ st.title("Uniswap v3 Impermanent Loss Calculator")
 # ------------------- UNISWAP V3 TEXT ------------------
 # ======================================================
 
-st.markdown(r"""
+@st.cache_resource
+def uniswap_v3_theory_md():
+    return r"""
 # 📘 Uniswap v3 Mathematics: Liquidity, Price, and Token Amounts
 
 ### 🔢 **1. Core Concentrated-Liquidity Invariant**
@@ -62,13 +72,17 @@ This is why all formulas involve \(\sqrt{p}\), \(1/\sqrt{p}\), etc.
 
 ---
 
-""")
+"""
+
+st.markdown(uniswap_v3_theory_md())
 
 # ======================================================
 # ------------------ IL THEORY TEXT --------------------
 # ======================================================
 
-st.markdown(r"""
+@st.cache_resource
+def il_theory_md():
+    return r"""
 # 📉 Impermanent Loss Fundamentals
 
 Assume the position was initialized at price \(p\) with liquidity \(L\).
@@ -116,7 +130,9 @@ $$
 $$
 
 (Always \(\le 0\) before fees.)
-""")
+"""
+
+st.markdown(il_theory_md())
 
 # ======================================================
 # -------------- INPUTS FOR LP POSITION ----------------
@@ -126,61 +142,28 @@ st.header("Interactive Range-LP Calculator")
 
 st.subheader("1. Position Inputs")
 
-p = st.number_input("Current price p (y per x)", min_value=1e-12, value=1.0)
-p_min = st.number_input("Lower price bound p_min", min_value=0.0, value=0.8)
-p_max = st.number_input("Upper price bound p_max", min_value=0.0, value=1.2)
-
+# The funding choice stays outside the form so the amount field below
+# switches between x and y as soon as it is changed.
 funding_mode = st.radio(
     "How do you fund the position?",
     ("I only have asset x", "I only have asset y")
 )
 
-if funding_mode == "I only have asset x":
-    x0 = st.number_input("Amount of token x", min_value=0.0, value=1000.0)
-    y0 = 0.0
-else:
-    y0 = st.number_input("Amount of token y", min_value=0.0, value=1000.0)
-    x0 = 0.0
-
-# ======================================================
-# ---------------- UTILITY FUNCTIONS -------------------
-# ======================================================
+# Inputs only take effect on "Update", so editing several of them costs a
+# single rerun instead of one per keystroke.
+with st.form("position"):
+    p = st.number_input("Current price p (y per x)", min_value=1e-12, value=1.0)
+    p_min = st.number_input("Lower price bound p_min", min_value=0.0, value=0.8)
+    p_max = st.number_input("Upper price bound p_max", min_value=0.0, value=1.2)
 
-def compute_L_from_x(x, p, pmin, pmax):
-    denom = 2 * math.sqrt(p) - math.sqrt(pmin) - p / math.sqrt(pmax)
-    if denom <= 0:
-        return float("nan")
-    return p * x / denom
-
-def x_amount(L, p, pmax):
-    return L * (1/math.sqrt(p) - 1/math.sqrt(pmax))
-
-def y_amount(L, p, pmin):
-    return L * (math.sqrt(p) - math.sqrt(pmin))
-
-def x_amount_future(L, p_prime, pmin, pmax):
-    if p_prime <= pmin:
-        # all-x region
-        return L * (1/math.sqrt(pmin) - 1/math.sqrt(pmax))
-    elif p_prime >= pmax:
-        # all-y region
-        return 0.0
+    if funding_mode == "I only have asset x":
+        x0 = st.number_input("Amount of token x", min_value=0.0, value=1000.0)
+        y0 = 0.0
     else:
-        # mixed region
-        return L * (1/math.sqrt(p_prime) - 1/math.sqrt(pmax))
-
-
-def y_amount_future(L, p_prime, pmin, pmax):
-    if p_prime <= pmin:
-        # all-x region
-        return 0.0
-    elif p_prime >= pmax:
-        # all-y region
-        return L * (math.sqrt(pmax) - math.sqrt(pmin))
-    else:
-        # mixed region
-        return L * (math.sqrt(p_prime) - math.sqrt(pmin))
+        y0 = st.number_input("Amount of token y", min_value=0.0, value=1000.0)
+        x0 = 0.0
 
+    st.form_submit_button("Update")
 
 # ======================================================
 # ------------------ LIQUIDITY BLOCK -------------------
@@ -192,6 +175,11 @@ if p_min >= p_max or p <= 0:
     st.error("Require 0 < p_min < p_max and p > 0.")
     st.stop()
 
+# Price and range roots shared by every formula below
+sqrt_p = math.sqrt(p)
+sqrt_pmin = math.sqrt(p_min)
+inv_sqrt_pmax = 1 / math.sqrt(p_max)
+
 # Funding conversion: only-y → convert to x
 if funding_mode == "I only have asset x":
     x_fund = x0
@@ -203,7 +191,7 @@ if x_fund <= 0:
     st.stop()
 
 # Compute L
-L = compute_L_from_x(x_fund, p, p_min, p_max)
+L = compute_L_from_x(x_fund, p, sqrt_p, sqrt_pmin, inv_sqrt_pmax)
 
 if math.isnan(L):
     st.error("Liquidity L became NaN. Check range and price.")
@@ -212,66 +200,76 @@ if math.isnan(L):
 st.success(f"Liquidity L = {L:.6f}")
 
 # Token composition at current price
-x_pos = x_amount(L, p, p_max)
-y_pos = y_amount(L, p, p_min)
+x_pos = x_amount(L, sqrt_p, inv_sqrt_pmax)
+y_pos = y_amount(L, sqrt_p, sqrt_pmin)
 
 st.write(f"**x in position:** {x_pos:.6f}")
 st.write(f"**y in position:** {y_pos:.6f}")
 
 st.caption("Exact tokens currently deposited in the active Uniswap v3 range.")
 
-# For IL use:
-p_initial = p
-x_init = x_pos
-y_init = y_pos
+# For IL use: the IL sections read the position from session state, so a
+# fragment rerun works off the last full run without recomputing anything
+st.session_state.update(
+    L=L,
+    p_min=p_min,
+    p_max=p_max,
+    sqrt_pmin=sqrt_pmin,
+    inv_sqrt_pmax=inv_sqrt_pmax,
+    x_init=x_pos,
+    y_init=y_pos,
+)
 
 # ======================================================
 # ---------------- IL AT A PARTICULAR p' ---------------
 # ======================================================
 
-st.header("Impermanent Loss at a Specific New Price")
+# Only the IL sections rerun when p' changes
+@st.fragment
+def il_section():
+    st.header("Impermanent Loss at a Specific New Price")
 
-p_new = st.number_input("New price p' for point IL estimate", min_value=1e-12, value=0.7)
+    p_new = st.number_input("New price p' for point IL estimate", min_value=1e-12, value=0.7)
 
-x_new = x_amount_future(L, p_new, p_min, p_max)
-y_new = y_amount_future(L, p_new, p_min, p_max)
+    state = st.session_state
+    L, p_min, p_max = state["L"], state["p_min"], state["p_max"]
+    sqrt_pmin, inv_sqrt_pmax = state["sqrt_pmin"], state["inv_sqrt_pmax"]
+    x_init, y_init = state["x_init"], state["y_init"]
 
-V_lp = x_new + y_new / p_new
-V_hodl = x_init + y_init / p_new
-IL_point = (V_hodl - V_lp) / V_hodl
+    x_new = x_amount_future(L, p_new, p_min, p_max, inv_sqrt_pmax)
+    y_new = y_amount_future(L, p_new, p_min, p_max, sqrt_pmin)
 
-st.write(f"**LP value at p' = {p_new}:** {V_lp:.6f}")
-st.write(f"**HODL value at p' = {V_hodl:.6f}**")
-st.write(f"### ➖ Point Impermanent Loss: {IL_point:.4%}")
+    V_lp = x_new + y_new / p_new
+    V_hodl = x_init + y_init / p_new
+    IL_point = (V_hodl - V_lp) / V_hodl
 
-# ======================================================
-# ------------------- FULL IL CURVE --------------------
-# ======================================================
+    st.write(f"**LP value at p' = {p_new}:** {V_lp:.6f}")
+    st.write(f"**HODL value at p' = {V_hodl:.6f}**")
+    st.write(f"### ➖ Point Impermanent Loss: {IL_point:.4%}")
 
-st.header("IL Curve Across Full Range (p' vs IL)")
+    # ------------------- FULL IL CURVE --------------------
 
-p_low = max(1e-12, p_min * 0.9)
-p_high = p_max * 1.1
+    st.header("IL Curve Across Full Range (p' vs IL)")
 
-p_vals = np.linspace(p_low, p_high, 600)
-IL_vals = []
+    curve = il_curve_table(L, p_min, p_max, x_init, y_init)
 
-for pprime in p_vals:
-    xp = x_amount_future(L, pprime, p_min, p_max)
-    yp = y_amount_future(L, pprime, p_min, p_max)
-    Vlp = xp + yp / pprime
-    Vhodl = x_init + y_init / pprime
-    if Vhodl == 0:
-        IL_vals.append(np.nan)
-    else:
-        IL_vals.append((Vhodl - Vlp) / Vhodl)
+    # Explicit quantitative encodings spare Vega-Lite the type inference
+    # st.line_chart does on every render
+    chart = (
+        alt.Chart(curve)
+        .mark_line()
+        .encode(
+            x=alt.X("p_prime", type="quantitative", title="p'"),
+            y=alt.Y("IL", type="quantitative"),
+        )
+        .properties(width="container", height=300)
+    )
+    st.altair_chart(chart)
 
-df_curve = pd.DataFrame({"p_prime": p_vals, "IL": IL_vals}).dropna()
-df_curve = df_curve.set_index("p_prime")
+    st.caption(
+        "Full IL curve from slightly below p_min to slightly above p_max.\n"
+        "Left plateau = all-x region. Right plateau = all-y region."
+    )
 
-st.line_chart(df_curve["IL"])
 
-st.caption(
-    "Full IL curve from slightly below p_min to slightly above p_max.\n"
-    "Left plateau = all-x region. Right plateau = all-y region."
-)
+il_section()